@@ -15,11 +15,8 @@ from dotenv import load_dotenv
 import logging
 from contextlib import asynccontextmanager
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
-from docling.document_converter import DocumentConverter
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import PdfPipelineOptions
+from encoders import SentenceEncoder, load_encoder
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -38,10 +35,22 @@ class Config:
     
     # RAG Configuration
     SENTENCE_TRANSFORMER_MODEL = os.getenv("SENTENCE_TRANSFORMER_MODEL", "all-MiniLM-L6-v2")
+    ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "pytorch")  # "pytorch" or "onnx"
+    ENCODER_DEVICE = os.getenv("ENCODER_DEVICE") or None  # PyTorch only, unset picks CUDA when available
+    ONNX_MODEL_DIRECTORY = os.getenv("ONNX_MODEL_DIRECTORY", "./onnx_model")
+    ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "true").lower() == "true"
+    ONNX_NUM_THREADS = int(os.getenv("ONNX_NUM_THREADS", "0"))
+    ENCODER_MAX_SEQ_LENGTH = int(os.getenv("ENCODER_MAX_SEQ_LENGTH", "0"))  # 0 keeps the model's own limit
     CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "250"))
     CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))
     PDF_DIRECTORY = os.getenv("PDF_DIRECTORY", "./pdfs")
     CACHE_DIRECTORY = os.getenv("CACHE_DIRECTORY", "./rag_cache")
+    
+    # Intent Router Configuration
+    INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "false").lower() == "true"
+    INTENTS_FILE = os.getenv("INTENTS_FILE", "./intents.json")
+    INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.75"))
+    BIRTH_DATE = os.getenv("BIRTH_DATE", "2004-01-22")
 
 # Global storage
 rate_limit_storage: Dict[str, List[float]] = {}
@@ -51,8 +60,13 @@ chat_storage: Dict[str, Any] = {}
 rag_documents: List[Dict] = []
 rag_embeddings: Optional[np.ndarray] = None
 rag_chunks: List[Dict] = []
-sentence_encoder: Optional[SentenceTransformer] = None
-document_converter: Optional[DocumentConverter] = None
+sentence_encoder: Optional[SentenceEncoder] = None
+document_converter = None  # docling DocumentConverter, created on first PDF
+
+# Intent Router Storage
+intents: Dict[str, Dict] = {}
+intent_labels: List[str] = []
+intent_embeddings: Optional[np.ndarray] = None
 
 # Conversation data class
 class ConversationData:
@@ -65,20 +79,42 @@ class ConversationData:
 # RAG Functions
 def initialize_rag_system():
     """Initialize the RAG system components"""
-    global sentence_encoder, document_converter
+    global sentence_encoder
     
     logger.info("Initializing RAG system...")
     
-    # Initialize sentence transformer
+    # Initialize sentence encoder
     try:
-        sentence_encoder = SentenceTransformer(Config.SENTENCE_TRANSFORMER_MODEL)
-        logger.info(f"Loaded sentence transformer: {Config.SENTENCE_TRANSFORMER_MODEL}")
+        sentence_encoder = load_encoder(
+            Config.ENCODER_BACKEND,
+            Config.SENTENCE_TRANSFORMER_MODEL,
+            Config.ONNX_MODEL_DIRECTORY,
+            quantized=Config.ONNX_QUANTIZED,
+            num_threads=Config.ONNX_NUM_THREADS,
+            max_seq_length=Config.ENCODER_MAX_SEQ_LENGTH or None,
+            device=Config.ENCODER_DEVICE
+        )
+        logger.info(f"Loaded sentence encoder: {sentence_encoder.encoder_id}")
     except Exception as e:
         logger.error(f"Failed to load sentence transformer: {e}")
         sentence_encoder = None
+
+def initialize_document_converter():
+    """Initialize the docling converter on first use
+    
+    docling pulls in torch-based layout and table models, so it is only
+    imported when a PDF actually has to be processed (cache miss or /add-pdf).
+    """
+    global document_converter
+    
+    if document_converter:
+        return
     
-    # Initialize docling converter
     try:
+        from docling.document_converter import DocumentConverter
+        from docling.datamodel.base_models import InputFormat
+        from docling.datamodel.pipeline_options import PdfPipelineOptions
+        
         pipeline_options = PdfPipelineOptions()
         pipeline_options.do_ocr = True
         pipeline_options.do_table_structure = True
@@ -91,8 +127,13 @@ def initialize_rag_system():
         logger.error(f"Failed to initialize docling: {e}")
         document_converter = None
 
+def get_rag_encoder_id() -> Optional[str]:
+    """Identify the encoder behind rag_embeddings, used as the cache key"""
+    return sentence_encoder.encoder_id if sentence_encoder else None
+
 def process_pdf(pdf_path: str, doc_id: str = None) -> Dict:
     """Process PDF using docling"""
+    initialize_document_converter()
     if not document_converter:
         raise Exception("Document converter not initialized")
     
@@ -169,7 +210,14 @@ def add_document_to_rag(pdf_path: str, doc_id: str = None):
     
     logger.info(f"Added document {doc_data['doc_id']} with {len(doc_chunks)} chunks")
 
-def search_rag(query: str, top_k: int = 3, similarity_threshold: float = 0.3) -> List[Dict]:
+def encode_query(query: str) -> Optional[np.ndarray]:
+    """Encode a query once so intent routing and RAG search can share it"""
+    if not sentence_encoder:
+        return None
+    return sentence_encoder.encode([query])
+
+def search_rag(query: str, top_k: int = 3, similarity_threshold: float = 0.3,
+               query_embedding: Optional[np.ndarray] = None) -> List[Dict]:
     """Search for relevant chunks using semantic similarity"""
     global rag_embeddings, rag_chunks, sentence_encoder
     
@@ -177,7 +225,8 @@ def search_rag(query: str, top_k: int = 3, similarity_threshold: float = 0.3) ->
         return []
     
     # Encode query
-    query_embedding = sentence_encoder.encode([query])
+    if query_embedding is None:
+        query_embedding = encode_query(query)
     
     # Calculate similarities
     similarities = cosine_similarity(query_embedding, rag_embeddings)[0]
@@ -194,9 +243,10 @@ def search_rag(query: str, top_k: int = 3, similarity_threshold: float = 0.3) ->
     results.sort(key=lambda x: x["similarity"], reverse=True)
     return results[:top_k]
 
-def get_context_for_query(query: str, max_context_length: int = 800) -> str:
+def get_context_for_query(query: str, max_context_length: int = 800,
+                          query_embedding: Optional[np.ndarray] = None) -> str:
     """Get formatted context for a query"""
-    search_results = search_rag(query, top_k=5)
+    search_results = search_rag(query, top_k=5, query_embedding=query_embedding)
     
     if not search_results:
         return ""
@@ -233,7 +283,7 @@ def save_rag_cache():
         "documents": rag_documents,
         "chunks": rag_chunks,
         "embeddings": rag_embeddings,
-        "model_name": Config.SENTENCE_TRANSFORMER_MODEL
+        "model_name": get_rag_encoder_id()
     }
     
     try:
@@ -257,8 +307,8 @@ def load_rag_cache() -> bool:
         with open(cache_path, "rb") as f:
             cache_data = pickle.load(f)
         
-        # Verify model compatibility
-        if cache_data.get("model_name") != Config.SENTENCE_TRANSFORMER_MODEL:
+        # Verify model compatibility (without an encoder the cache can't be checked or rebuilt, so keep it)
+        if sentence_encoder and cache_data.get("model_name") != get_rag_encoder_id():
             logger.warning("Cache model mismatch, rebuilding...")
             return False
         
@@ -275,6 +325,10 @@ def load_rag_cache() -> bool:
 
 def process_all_pdfs():
     """Process all PDFs in the PDF directory"""
+    if not sentence_encoder:
+        logger.warning("Sentence encoder not available, skipping PDF processing")
+        return
+    
     pdf_directory = Path(Config.PDF_DIRECTORY)
     
     if not pdf_directory.exists():
@@ -297,6 +351,105 @@ def process_all_pdfs():
     # Save cache after processing
     save_rag_cache()
 
+# Intent Router Functions
+def calculate_age(birth_date: datetime, today: Optional[datetime] = None) -> int:
+    """Calculate age in whole years from a birth date"""
+    today = today or datetime.now()
+    age = today.year - birth_date.year
+    if (today.month, today.day) < (birth_date.month, birth_date.day):
+        age -= 1
+    return age
+
+def get_template_values() -> Dict[str, Any]:
+    """Values available to templated intent responses"""
+    birth_date = datetime.strptime(Config.BIRTH_DATE, "%Y-%m-%d")
+    return {
+        "age": calculate_age(birth_date),
+        "birth_date": birth_date.strftime("%B %d, %Y")
+    }
+
+def initialize_intent_router():
+    """Load the intent table and precompute example embeddings"""
+    global intents, intent_labels, intent_embeddings
+    
+    if not Config.INTENT_ROUTER_ENABLED:
+        logger.info("Intent router disabled")
+        return
+    
+    if not sentence_encoder:
+        logger.warning("Sentence encoder not available, intent router disabled")
+        return
+    
+    intents_path = Path(Config.INTENTS_FILE)
+    if not intents_path.exists():
+        logger.warning(f"Intents file {Config.INTENTS_FILE} not found, intent router disabled")
+        return
+    
+    try:
+        with open(intents_path, "r", encoding="utf-8") as f:
+            intent_table = json.load(f)
+        
+        loaded_intents = {}
+        labels = []
+        examples = []
+        for intent in intent_table:
+            loaded_intents[intent["name"]] = intent
+            for example in intent["examples"]:
+                labels.append(intent["name"])
+                examples.append(example)
+        
+        if not examples:
+            logger.warning("Intent table has no examples, intent router disabled")
+            return
+        
+        intent_embeddings = sentence_encoder.encode(examples)
+        intents = loaded_intents
+        intent_labels = labels
+        
+        logger.info(f"Loaded {len(intents)} intents with {len(examples)} examples")
+    except Exception as e:
+        logger.error(f"Error loading intents: {e}")
+        intents, intent_labels, intent_embeddings = {}, [], None
+
+def match_intent(query: str, query_embedding: Optional[np.ndarray] = None) -> Optional[Dict]:
+    """Find the nearest intent and whether it clears its threshold"""
+    if intent_embeddings is None or not sentence_encoder:
+        return None
+    
+    if query_embedding is None:
+        query_embedding = encode_query(query)
+    similarities = cosine_similarity(query_embedding, intent_embeddings)[0]
+    
+    best_idx = int(np.argmax(similarities))
+    confidence = float(similarities[best_idx])
+    intent = intents[intent_labels[best_idx]]
+    threshold = intent.get("threshold", Config.INTENT_CONFIDENCE_THRESHOLD)
+    
+    return {
+        "intent": intent["name"],
+        "confidence": confidence,
+        "threshold": threshold,
+        "matched": confidence >= threshold
+    }
+
+def route_intent(query: str, query_embedding: Optional[np.ndarray] = None) -> Optional[Dict]:
+    """Match a query to the nearest intent, if confident enough"""
+    match = match_intent(query, query_embedding)
+    if not match or not match["matched"]:
+        return None
+    
+    try:
+        response = intents[match["intent"]]["response"].format(**get_template_values())
+    except (KeyError, IndexError, ValueError) as e:
+        logger.error(f"Error rendering intent {match['intent']}: {e}")
+        return None
+    
+    return {
+        "intent": match["intent"],
+        "confidence": match["confidence"],
+        "response": response
+    }
+
 # Chat system functions
 async def get_client_ip(request) -> str:
     return request.client.host
@@ -338,6 +491,7 @@ async def lifespan(app: FastAPI):
     
     # Initialize RAG system
     initialize_rag_system()
+    initialize_intent_router()
     
     # Load cache or process PDFs
     if not load_rag_cache():
@@ -398,6 +552,7 @@ class ChatResponse(BaseModel):
     conversation_id: str
     timestamp: datetime
     context_used: bool
+    intent: Optional[str] = None
 
 # System prompt
 SYSTEM_MESSAGE = {
@@ -465,12 +620,6 @@ async def chat(request: ChatRequest, client_ip: str = Depends(get_client_ip)):
             detail="Slow down a bit! Try again in a minute."
         )
     
-    if not client:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="AI service unavailable"
-        )
-    
     try:
         # Get or create conversation
         conversation_id = request.conversation_id or str(uuid.uuid4())
@@ -495,8 +644,35 @@ async def chat(request: ChatRequest, client_ip: str = Depends(get_client_ip)):
         }
         conversation.messages.append(user_message)
         
+        # Answer deterministic questions without calling the LLM
+        query_embedding = encode_query(request.message)
+        routed = route_intent(request.message, query_embedding)
+        if routed:
+            logger.info(f"Intent '{routed['intent']}' matched ({routed['confidence']:.2f}) for query: {request.message[:50]}...")
+            conversation.messages.append({
+                "role": "assistant",
+                "content": routed["response"],
+                "timestamp": datetime.now().isoformat()
+            })
+            conversation.last_activity = datetime.now()
+            conversation.message_count += 1
+            
+            return ChatResponse(
+                response=routed["response"],
+                conversation_id=conversation_id,
+                timestamp=datetime.now(),
+                context_used=False,
+                intent=routed["intent"]
+            )
+        
+        if not client:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="AI service unavailable"
+            )
+        
         # Get RAG context
-        rag_context = get_context_for_query(request.message)
+        rag_context = get_context_for_query(request.message, query_embedding=query_embedding)
         context_used = bool(rag_context)
         
         # Build API messages
@@ -605,10 +781,12 @@ async def chat(request: ChatRequest, client_ip: str = Depends(get_client_ip)):
 async def rag_status():
     """Check RAG system status"""
     return {
-        "status": "active" if sentence_encoder and document_converter else "inactive",
+        "status": "active" if sentence_encoder else "inactive",
+        "document_converter_loaded": document_converter is not None,
         "documents": len(rag_documents),
         "chunks": len(rag_chunks),
         "model": Config.SENTENCE_TRANSFORMER_MODEL,
+        "encoder": get_rag_encoder_id(),
         "pdf_directory": Config.PDF_DIRECTORY
     }
 
@@ -637,6 +815,15 @@ async def search_context(query: str, top_k: int = 3):
         "formatted_context": get_context_for_query(query)
     }
 
+@app.get("/route-intent")
+async def route_intent_debug(query: str):
+    """Show which intent a query routes to (for debugging)"""
+    return {
+        "query": query,
+        "intents_loaded": len(intents),
+        "match": match_intent(query)
+    }
+
 @app.get("/conversations/{conversation_id}/history")
 async def get_conversation_history(conversation_id: str):
     """Get conversation history"""
@@ -672,6 +859,10 @@ async def health_check():
             "documents": len(rag_documents),
             "chunks": len(rag_chunks),
             "encoder_loaded": sentence_encoder is not None
+        },
+        "intent_router": {
+            "enabled": Config.INTENT_ROUTER_ENABLED,
+            "intents": len(intents)
         }
     }
 
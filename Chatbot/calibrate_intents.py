@@ -0,0 +1,77 @@
+"""Sweep intent router thresholds over intent_eval.json with the configured encoder
+
+Usage: python calibrate_intents.py [--eval-file intent_eval.json]
+
+Prints precision/recall per global threshold and, for each intent, the highest
+near-miss confidence it attracted and the lowest confidence of its positives.
+A per-intent "threshold" in intents.json should sit above the former.
+"""
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+import app
+
+def score_eval_set(eval_set: dict) -> list:
+    """Nearest intent and confidence for every labelled query"""
+    labelled = [(case["query"], case["intent"]) for case in eval_set["positives"]]
+    labelled += [(query, None) for query in eval_set["negatives"]]
+
+    scored = []
+    for query, expected in labelled:
+        match = app.match_intent(query)
+        scored.append({
+            "query": query,
+            "expected": expected,
+            "intent": match["intent"],
+            "confidence": match["confidence"]
+        })
+    return scored
+
+def sweep(scored: list, thresholds) -> list:
+    positives = sum(1 for case in scored if case["expected"])
+    rows = []
+    for threshold in thresholds:
+        fired = [case for case in scored if case["confidence"] >= threshold]
+        correct = sum(1 for case in fired if case["intent"] == case["expected"])
+        rows.append({
+            "threshold": round(float(threshold), 2),
+            "fired": len(fired),
+            "precision": correct / len(fired) if fired else 1.0,
+            "recall": correct / positives if positives else 0.0
+        })
+    return rows
+
+def per_intent_bounds(scored: list) -> dict:
+    bounds = {}
+    for name in app.intents:
+        misses = [c["confidence"] for c in scored if c["intent"] == name and c["expected"] != name]
+        hits = [c["confidence"] for c in scored if c["intent"] == name and c["expected"] == name]
+        bounds[name] = {
+            "max_near_miss": max(misses) if misses else None,
+            "min_positive": min(hits) if hits else None
+        }
+    return bounds
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate intent router thresholds")
+    parser.add_argument("--eval-file", default=str(Path(__file__).parent / "intent_eval.json"))
+    args = parser.parse_args()
+
+    app.Config.INTENT_ROUTER_ENABLED = True
+    app.initialize_rag_system()
+    app.initialize_intent_router()
+    if not app.intents:
+        raise SystemExit("Intent router could not be initialized, check the encoder and INTENTS_FILE")
+
+    with open(args.eval_file, "r", encoding="utf-8") as f:
+        scored = score_eval_set(json.load(f))
+
+    print(json.dumps({
+        "encoder": app.sentence_encoder.encoder_id,
+        "sweep": sweep(scored, np.arange(0.5, 0.96, 0.05)),
+        "per_intent": per_intent_bounds(scored),
+        "queries": scored
+    }, indent=2))
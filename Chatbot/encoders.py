@@ -0,0 +1,156 @@
+import json
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model.int8.onnx"
+ENCODER_CONFIG_FILE = "encoder_config.json"
+SUPPORTED_POOLING_MODES = ["cls", "mean", "max"]
+
+def get_encoder_id(backend: str, model_name: str, quantized: bool = True, max_seq_length: Optional[int] = None) -> str:
+    """Identify embeddings produced by a backend, so caches are not mixed"""
+    if backend == "onnx":
+        encoder_id = f"{model_name}:onnx-int8" if quantized else f"{model_name}:onnx"
+    else:
+        encoder_id = f"{model_name}:pytorch"
+    if max_seq_length:
+        encoder_id += f":seq{max_seq_length}"
+    return encoder_id
+
+# Encoder backends
+class SentenceEncoder(ABC):
+    """Common interface for sentence embedding backends"""
+    backend = "base"
+    model_name: str
+    max_seq_length: int
+
+    @abstractmethod
+    def encode(self, texts: List[str], show_progress_bar: bool = False, batch_size: int = 32) -> np.ndarray:
+        """Encode texts into a (len(texts), dim) float32 array"""
+
+    @property
+    def encoder_id(self) -> str:
+        return get_encoder_id(self.backend, self.model_name, getattr(self, "quantized", False), self.max_seq_length)
+
+class PyTorchEncoder(SentenceEncoder):
+    """Full PyTorch sentence-transformers model"""
+    backend = "pytorch"
+
+    def __init__(self, model_name: str, max_seq_length: Optional[int] = None, device: Optional[str] = None):
+        from sentence_transformers import SentenceTransformer
+
+        # device=None lets sentence-transformers pick CUDA when available
+        self.model = SentenceTransformer(model_name, device=device)
+        if max_seq_length:
+            self.model.max_seq_length = max_seq_length
+
+        self.model_name = model_name
+        self.max_seq_length = self.model.max_seq_length
+
+    def encode(self, texts: List[str], show_progress_bar: bool = False, batch_size: int = 32) -> np.ndarray:
+        return self.model.encode(texts, show_progress_bar=show_progress_bar, batch_size=batch_size)
+
+class OnnxEncoder(SentenceEncoder):
+    """Exported sentence-transformers model running on ONNX Runtime (CPU)
+
+    Pooling, normalization, padding and the default sequence length are read
+    from the encoder_config.json written by export_encoder.py.
+    """
+    backend = "onnx"
+
+    def __init__(self, model_dir: str, model_name: Optional[str] = None, quantized: bool = True,
+                 num_threads: int = 0, max_seq_length: Optional[int] = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        config_path = model_dir / ENCODER_CONFIG_FILE
+        if not config_path.exists():
+            raise FileNotFoundError(f"Encoder config not found: {config_path}, re-run the export")
+
+        with open(config_path, "r") as f:
+            encoder_config = json.load(f)
+
+        if model_name and encoder_config["model_name"] != model_name:
+            raise ValueError(
+                f"ONNX model in {model_dir} was exported from {encoder_config['model_name']}, expected {model_name}"
+            )
+
+        model_path = model_dir / (ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        if not model_path.exists():
+            raise FileNotFoundError(f"ONNX model not found: {model_path}")
+
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            session_options.intra_op_num_threads = num_threads
+            session_options.inter_op_num_threads = 1
+
+        self.session = ort.InferenceSession(
+            str(model_path), session_options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.model_name = encoder_config["model_name"]
+        self.max_seq_length = max_seq_length or encoder_config["max_seq_length"]
+        self.pooling_mode = encoder_config["pooling_mode"]
+        self.normalize = encoder_config["normalize"]
+        self.quantized = quantized
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding(pad_id=encoder_config["pad_token_id"], pad_token=encoder_config["pad_token"])
+
+    def pool(self, token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        """Apply the pooling recorded at export time"""
+        if self.pooling_mode == "cls":
+            return token_embeddings[:, 0]
+
+        mask = attention_mask[..., np.newaxis].astype(np.float32)
+        if self.pooling_mode == "max":
+            return np.where(mask > 0, token_embeddings, -1e9).max(axis=1)
+        return (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(self, texts: List[str], show_progress_bar: bool = False, batch_size: int = 32) -> np.ndarray:
+        embeddings = []
+
+        for i in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[i:i + batch_size])
+
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            pooled = self.pool(token_embeddings, attention_mask)
+            if self.normalize:
+                pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            embeddings.append(pooled.astype(np.float32))
+
+            if show_progress_bar:
+                logger.info(f"Encoded {min(i + batch_size, len(texts))}/{len(texts)} texts")
+
+        if not embeddings:
+            return np.zeros((0, self.session.get_outputs()[0].shape[-1]), dtype=np.float32)
+
+        return np.vstack(embeddings)
+
+def load_encoder(backend: str, model_name: str, onnx_model_dir: str, quantized: bool = True,
+                 num_threads: int = 0, max_seq_length: Optional[int] = None,
+                 device: Optional[str] = None) -> SentenceEncoder:
+    """Create the configured encoder backend"""
+    if backend == "pytorch":
+        return PyTorchEncoder(model_name, max_seq_length=max_seq_length, device=device)
+    if backend == "onnx":
+        return OnnxEncoder(onnx_model_dir, model_name=model_name, quantized=quantized,
+                           num_threads=num_threads, max_seq_length=max_seq_length)
+    raise ValueError(f"Unknown encoder backend: {backend}")
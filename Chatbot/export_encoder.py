@@ -0,0 +1,259 @@
+import argparse
+import inspect
+import json
+import logging
+import multiprocessing
+import pickle
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from encoders import ENCODER_CONFIG_FILE, ONNX_MODEL_FILE, ONNX_QUANTIZED_MODEL_FILE, SUPPORTED_POOLING_MODES, load_encoder
+
+logger = logging.getLogger(__name__)
+
+PARITY_SAMPLE_TEXTS = [
+    "What is your email address?",
+    "How old are you?",
+    "Where were you born?",
+    "Tell me about your work experience in machine learning.",
+    "Which projects have you built with FastAPI and Docker?",
+    "What did you win at Smart India Hackathon?",
+    "B.Tech in Computer Science & Business Systems at Meghnad Saha Institute of Technology",
+    "hey, what's up?"
+]
+
+# Export and parity tooling
+def get_export_settings(model) -> Dict:
+    """Read pooling and normalization from a sentence-transformers model, rejecting unsupported layouts"""
+    from sentence_transformers.models import Normalize, Pooling, Transformer
+
+    modules = list(model)
+    if len(modules) < 2 or not isinstance(modules[0], Transformer) or not isinstance(modules[1], Pooling):
+        raise ValueError("Only Transformer + Pooling (+ Normalize) models can be exported")
+    if len(modules) > 3 or (len(modules) == 3 and not isinstance(modules[2], Normalize)):
+        extra = ", ".join(type(module).__name__ for module in modules[2:])
+        raise ValueError(f"Unsupported modules after pooling: {extra}")
+
+    pooling = modules[1]
+    # sentence-transformers < 4 exposes the mode through get_pooling_mode_str()
+    pooling_mode = pooling.get_pooling_mode_str() if hasattr(pooling, "get_pooling_mode_str") else pooling.pooling_mode
+    if pooling_mode not in SUPPORTED_POOLING_MODES:
+        raise ValueError(f"Unsupported pooling mode: {pooling_mode}")
+
+    return {
+        "pooling_mode": pooling_mode,
+        "normalize": len(modules) == 3
+    }
+
+def export_onnx(model_name: str, output_dir: str, quantize: bool = True, opset: int = 14):
+    """Export a sentence-transformers model to ONNX, optionally with dynamic int8 quantization"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    model = SentenceTransformer(model_name, device="cpu")
+    export_settings = get_export_settings(model)
+
+    model.tokenizer.save_pretrained(str(output_path))
+
+    dummy = model.tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ["input_ids", "attention_mask", "token_type_ids"] if name in dummy]
+
+    class TokenEmbeddings(torch.nn.Module):
+        """Pass inputs by name, since positional order varies across transformers versions"""
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, *inputs):
+            return self.auto_model(**dict(zip(input_names, inputs)), return_dict=True).last_hidden_state
+
+    transformer = TokenEmbeddings(model[0].auto_model)
+    transformer.eval()
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    # torch >= 2.9 defaults to the dynamo exporter, which needs onnxscript
+    export_kwargs = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+
+    model_path = output_path / ONNX_MODEL_FILE
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(dummy[name] for name in input_names),
+            str(model_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True,
+            **export_kwargs
+        )
+    logger.info(f"Exported ONNX model to {model_path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = output_path / ONNX_QUANTIZED_MODEL_FILE
+        quantize_dynamic(str(model_path), str(quantized_path), weight_type=QuantType.QInt8)
+        logger.info(f"Saved int8 quantized model to {quantized_path}")
+
+    encoder_config = {
+        "model_name": model_name,
+        "max_seq_length": model.max_seq_length,
+        "pad_token": model.tokenizer.pad_token,
+        "pad_token_id": model.tokenizer.pad_token_id,
+        **export_settings
+    }
+    with open(output_path / ENCODER_CONFIG_FILE, "w") as f:
+        json.dump(encoder_config, f, indent=2)
+
+def get_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB, None where unsupported"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def profile_backend(encoder_kwargs: Dict, queries: List[str], corpus: List[str], repeats: int = 50) -> Dict:
+    """Load one backend and measure RSS, single-query latency and embeddings
+
+    Runs in a fresh process (see run_profile) so each backend's RSS is measured in isolation.
+    The corpus is encoded last, so batch activations do not inflate the serving RSS.
+    """
+    encoder = load_encoder(**encoder_kwargs)
+    loaded_rss = get_rss_mb()
+
+    # Warm up, then time single-query encodes as served by /chat
+    query_embeddings = encoder.encode(queries)
+    latencies = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        encoder.encode([queries[i % len(queries)]])
+        latencies.append((time.perf_counter() - start) * 1000)
+    serving_rss = get_rss_mb()
+
+    corpus_embeddings = encoder.encode(corpus, batch_size=32)
+
+    return {
+        "encoder": encoder.encoder_id,
+        "loaded_rss_mb": loaded_rss,
+        "serving_rss_mb": serving_rss,
+        "query_latency_ms_p50": float(np.percentile(latencies, 50)),
+        "query_latency_ms_p95": float(np.percentile(latencies, 95)),
+        "query_embeddings": query_embeddings,
+        "corpus_embeddings": corpus_embeddings
+    }
+
+def run_profile(encoder_kwargs: Dict, queries: List[str], corpus: List[str], repeats: int = 50) -> Dict:
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(profile_backend, (encoder_kwargs, queries, corpus, repeats))
+
+def normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    return embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+
+def check_parity(reference: Dict, candidate: Dict, top_k: int = 5) -> Dict:
+    """Measure cosine agreement and retrieval overlap between two profiled backends"""
+    reference_queries = normalize_rows(reference["query_embeddings"])
+    candidate_queries = normalize_rows(candidate["query_embeddings"])
+    reference_corpus = normalize_rows(reference["corpus_embeddings"])
+    candidate_corpus = normalize_rows(candidate["corpus_embeddings"])
+
+    agreement = np.concatenate([
+        (reference_queries * candidate_queries).sum(axis=1),
+        (reference_corpus * candidate_corpus).sum(axis=1)
+    ])
+
+    # Retrieval quality depends on ranking, so compare each query's top-k corpus hits
+    top_k = min(top_k, len(reference_corpus))
+    reference_hits = np.argsort(-(reference_queries @ reference_corpus.T), axis=1)[:, :top_k]
+    candidate_hits = np.argsort(-(candidate_queries @ candidate_corpus.T), axis=1)[:, :top_k]
+    overlap = [len(set(r) & set(c)) / top_k for r, c in zip(reference_hits, candidate_hits)]
+    top1 = (reference_hits[:, 0] == candidate_hits[:, 0]).mean()
+
+    return {
+        "queries": len(reference_queries),
+        "corpus": len(reference_corpus),
+        "mean_cosine": float(agreement.mean()),
+        "min_cosine": float(agreement.min()),
+        f"top{top_k}_overlap": float(np.mean(overlap)),
+        "top1_agreement": float(top1)
+    }
+
+def load_corpus(rag_cache: Optional[str]) -> List[str]:
+    """Use real RAG chunks when a cache is given, the sample texts otherwise"""
+    if not rag_cache:
+        return PARITY_SAMPLE_TEXTS
+
+    with open(rag_cache, "rb") as f:
+        cache_data = pickle.load(f)
+    return [chunk["text"] for chunk in cache_data["chunks"]]
+
+def load_queries(queries_file: Optional[str]) -> List[str]:
+    if not queries_file:
+        return PARITY_SAMPLE_TEXTS
+
+    with open(queries_file, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Export and verify the ONNX sentence encoder")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export the model to ONNX")
+    export_parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    export_parser.add_argument("--output-dir", default="./onnx_model")
+    export_parser.add_argument("--no-quantize", action="store_true")
+
+    parity_parser = subparsers.add_parser("parity", help="Compare ONNX against PyTorch: agreement, latency and RSS")
+    parity_parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parity_parser.add_argument("--model-dir", default="./onnx_model")
+    parity_parser.add_argument("--no-quantize", action="store_true")
+    parity_parser.add_argument("--max-seq-length", type=int, default=None)
+    parity_parser.add_argument("--num-threads", type=int, default=0)
+    parity_parser.add_argument("--device", default="cpu", help="Device for the PyTorch reference")
+    parity_parser.add_argument("--rag-cache", default=None, help="rag_cache.pkl whose chunks are used as the corpus")
+    parity_parser.add_argument("--queries-file", default=None, help="One query per line")
+    parity_parser.add_argument("--repeats", type=int, default=50)
+    parity_parser.add_argument("--top-k", type=int, default=5)
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_onnx(args.model, args.output_dir, quantize=not args.no_quantize)
+    else:
+        queries = load_queries(args.queries_file)
+        corpus = load_corpus(args.rag_cache)
+        encoder_kwargs = {
+            "model_name": args.model,
+            "onnx_model_dir": args.model_dir,
+            "quantized": not args.no_quantize,
+            "num_threads": args.num_threads,
+            "max_seq_length": args.max_seq_length,
+            "device": args.device
+        }
+
+        reference = run_profile({**encoder_kwargs, "backend": "pytorch"}, queries, corpus, args.repeats)
+        candidate = run_profile({**encoder_kwargs, "backend": "onnx"}, queries, corpus, args.repeats)
+
+        report = {
+            "parity": check_parity(reference, candidate, top_k=args.top_k),
+            "backends": [
+                {key: value for key, value in profile.items() if not key.endswith("_embeddings")}
+                for profile in (reference, candidate)
+            ]
+        }
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from encoders import OnnxEncoder, get_encoder_id
+from export_encoder import check_parity, get_export_settings
+
+# Two sequences: the second has two padded positions holding large values
+# that must never leak into the pooled embedding.
+TOKEN_EMBEDDINGS = np.array([
+    [[1.0, 2.0], [3.0, 4.0], [5.0, 0.0], [7.0, 8.0]],
+    [[2.0, 2.0], [4.0, 6.0], [100.0, 100.0], [100.0, 100.0]]
+], dtype=np.float32)
+ATTENTION_MASK = np.array([
+    [1, 1, 1, 1],
+    [1, 1, 0, 0]
+], dtype=np.int64)
+
+class FakeTokenizer:
+    def encode_batch(self, texts):
+        return [
+            SimpleNamespace(ids=list(row), attention_mask=list(mask), type_ids=[0] * len(row))
+            for row, mask in zip(np.arange(len(texts) * 4).reshape(-1, 4), ATTENTION_MASK[:len(texts)])
+        ]
+
+class FakeSession:
+    def run(self, outputs, feeds):
+        return [TOKEN_EMBEDDINGS[:len(feeds["input_ids"])]]
+
+def make_onnx_encoder(pooling_mode: str = "mean", normalize: bool = False) -> OnnxEncoder:
+    """OnnxEncoder wired to fakes, so pooling and normalization run without onnxruntime"""
+    encoder = OnnxEncoder.__new__(OnnxEncoder)
+    encoder.session = FakeSession()
+    encoder.tokenizer = FakeTokenizer()
+    encoder.input_names = {"input_ids", "attention_mask"}
+    encoder.pooling_mode = pooling_mode
+    encoder.normalize = normalize
+    return encoder
+
+def test_cls_pooling_takes_first_token():
+    pooled = make_onnx_encoder("cls").pool(TOKEN_EMBEDDINGS, ATTENTION_MASK)
+    np.testing.assert_allclose(pooled, [[1.0, 2.0], [2.0, 2.0]])
+
+def test_mean_pooling_ignores_padding():
+    pooled = make_onnx_encoder("mean").pool(TOKEN_EMBEDDINGS, ATTENTION_MASK)
+    np.testing.assert_allclose(pooled, [[4.0, 3.5], [3.0, 4.0]])
+
+def test_max_pooling_ignores_padding():
+    pooled = make_onnx_encoder("max").pool(TOKEN_EMBEDDINGS, ATTENTION_MASK)
+    np.testing.assert_allclose(pooled, [[7.0, 8.0], [4.0, 6.0]])
+
+def test_encode_normalizes_when_configured():
+    embeddings = make_onnx_encoder("mean", normalize=True).encode(["a", "b"])
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), [1.0, 1.0], rtol=1e-6)
+    np.testing.assert_allclose(embeddings[1], np.array([3.0, 4.0]) / 5.0, rtol=1e-6)
+    assert embeddings.dtype == np.float32
+
+def test_encode_keeps_raw_pooling_without_normalize():
+    embeddings = make_onnx_encoder("mean", normalize=False).encode(["a", "b"])
+    np.testing.assert_allclose(embeddings, [[4.0, 3.5], [3.0, 4.0]])
+
+def test_encoder_id_variants():
+    assert get_encoder_id("onnx", "all-MiniLM-L6-v2", quantized=True) == "all-MiniLM-L6-v2:onnx-int8"
+    assert get_encoder_id("onnx", "all-MiniLM-L6-v2", quantized=False) == "all-MiniLM-L6-v2:onnx"
+    assert get_encoder_id("pytorch", "all-MiniLM-L6-v2", quantized=True) == "all-MiniLM-L6-v2:pytorch"
+    assert get_encoder_id("onnx", "all-MiniLM-L6-v2", True, 128) == "all-MiniLM-L6-v2:onnx-int8:seq128"
+    assert get_encoder_id("pytorch", "all-MiniLM-L6-v2", max_seq_length=256) == "all-MiniLM-L6-v2:pytorch:seq256"
+
+def test_check_parity_identical_embeddings():
+    rng = np.random.default_rng(0)
+    profile = {
+        "query_embeddings": rng.normal(size=(4, 8)),
+        "corpus_embeddings": rng.normal(size=(10, 8))
+    }
+    parity = check_parity(profile, dict(profile), top_k=3)
+
+    assert parity["mean_cosine"] == pytest.approx(1.0)
+    assert parity["min_cosine"] == pytest.approx(1.0)
+    assert parity["top3_overlap"] == 1.0
+    assert parity["top1_agreement"] == 1.0
+
+def test_export_settings_reads_pooling_and_normalize():
+    models = pytest.importorskip("sentence_transformers.models")
+    transformer = models.Transformer.__new__(models.Transformer)
+    settings = get_export_settings([transformer, models.Pooling(8, pooling_mode="cls")])
+    assert settings == {"pooling_mode": "cls", "normalize": False}
+
+    settings = get_export_settings([transformer, models.Pooling(8, pooling_mode="mean"), models.Normalize()])
+    assert settings == {"pooling_mode": "mean", "normalize": True}
+
+def test_export_settings_rejects_unsupported_models():
+    models = pytest.importorskip("sentence_transformers.models")
+    transformer = models.Transformer.__new__(models.Transformer)
+    with pytest.raises(ValueError, match="Unsupported modules"):
+        get_export_settings([transformer, models.Pooling(8, pooling_mode="mean"), models.Dense(8, 8)])
+    with pytest.raises(ValueError, match="Unsupported pooling mode"):
+        get_export_settings([transformer, models.Pooling(8, pooling_mode="weightedmean")])
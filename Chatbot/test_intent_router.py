@@ -0,0 +1,128 @@
+import json
+import re
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+
+import app
+from encoders import SentenceEncoder, load_encoder
+
+CHATBOT_DIR = Path(__file__).parent
+INTENTS_FILE = CHATBOT_DIR / "intents.json"
+INTENT_EVAL_FILE = CHATBOT_DIR / "intent_eval.json"
+
+class BagOfWordsEncoder(SentenceEncoder):
+    """Deterministic stand-in for the sentence encoder: hashed word counts"""
+    backend = "fake"
+    model_name = "bag-of-words"
+    max_seq_length = 256
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts: List[str], show_progress_bar: bool = False, batch_size: int = 32) -> np.ndarray:
+        self.calls += 1
+        embeddings = np.zeros((len(texts), 1024), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"[a-z0-9']+", text.lower()):
+                embeddings[row, zlib.crc32(word.encode()) % 1024] += 1
+        return embeddings
+
+def load_router(monkeypatch, encoder: SentenceEncoder, intents_file: Path = INTENTS_FILE):
+    monkeypatch.setattr(app, "sentence_encoder", encoder)
+    monkeypatch.setattr(app, "intents", {})
+    monkeypatch.setattr(app, "intent_labels", [])
+    monkeypatch.setattr(app, "intent_embeddings", None)
+    monkeypatch.setattr(app.Config, "INTENT_ROUTER_ENABLED", True)
+    monkeypatch.setattr(app.Config, "INTENTS_FILE", str(intents_file))
+    app.initialize_intent_router()
+
+@pytest.fixture
+def fake_router(monkeypatch):
+    encoder = BagOfWordsEncoder()
+    load_router(monkeypatch, encoder)
+    return encoder
+
+def test_calculate_age_before_and_after_birthday():
+    birth_date = datetime(2004, 1, 22)
+    assert app.calculate_age(birth_date, today=datetime(2026, 1, 21)) == 21
+    assert app.calculate_age(birth_date, today=datetime(2026, 1, 22)) == 22
+    assert app.calculate_age(birth_date, today=datetime(2026, 10, 19)) == 22
+
+def test_route_intent_answers_exact_example(fake_router):
+    routed = app.route_intent("What is your email?")
+    assert routed["intent"] == "email"
+    assert "debarghyasren@gmail.com" in routed["response"]
+
+def test_route_intent_renders_birth_date_from_config(fake_router, monkeypatch):
+    monkeypatch.setattr(app.Config, "BIRTH_DATE", "2004-01-22")
+    routed = app.route_intent("how old are you")
+    assert routed["intent"] == "age"
+    assert "January 22, 2004" in routed["response"]
+    assert f"{app.calculate_age(datetime(2004, 1, 22))} years old" in routed["response"]
+
+def test_route_intent_ignores_unrelated_query(fake_router):
+    assert app.route_intent("tell me about your favourite movies") is None
+
+def test_match_intent_reports_nearest_intent_below_threshold(fake_router):
+    match = app.match_intent("where was your mom born")
+    assert match["intent"] == "birthplace"
+    assert match["threshold"] == app.Config.INTENT_CONFIDENCE_THRESHOLD
+    assert match["matched"] is False
+    assert 0 < match["confidence"] < match["threshold"]
+
+def test_match_intent_applies_per_intent_threshold(monkeypatch, tmp_path):
+    intent_table = json.loads(INTENTS_FILE.read_text())
+    for intent in intent_table:
+        if intent["name"] == "email":
+            intent["threshold"] = 1.01
+    intents_file = tmp_path / "intents.json"
+    intents_file.write_text(json.dumps(intent_table))
+    load_router(monkeypatch, BagOfWordsEncoder(), intents_file)
+
+    match = app.match_intent("what is your email")
+    assert match["intent"] == "email"
+    assert match["threshold"] == 1.01
+    assert match["matched"] is False
+    assert app.route_intent("what is your email") is None
+
+def test_route_intent_reuses_query_embedding(fake_router):
+    query_embedding = app.encode_query("how can I contact you")
+    calls = fake_router.calls
+
+    assert app.route_intent("how can I contact you", query_embedding)["intent"] == "email"
+    assert fake_router.calls == calls
+
+def test_router_disabled_without_encoder(monkeypatch):
+    load_router(monkeypatch, None)
+    assert app.match_intent("what is your email") is None
+    assert app.route_intent("what is your email") is None
+
+def test_routing_precision_at_configured_threshold(monkeypatch):
+    """Labelled positives and near-miss negatives, scored with the real encoder"""
+    try:
+        encoder = load_encoder(
+            app.Config.ENCODER_BACKEND,
+            app.Config.SENTENCE_TRANSFORMER_MODEL,
+            app.Config.ONNX_MODEL_DIRECTORY,
+            quantized=app.Config.ONNX_QUANTIZED
+        )
+    except Exception as e:
+        pytest.skip(f"Sentence encoder unavailable: {e}")
+    load_router(monkeypatch, encoder)
+
+    eval_set = json.loads(INTENT_EVAL_FILE.read_text())
+    labelled = [(case["query"], case["intent"]) for case in eval_set["positives"]]
+    labelled += [(query, None) for query in eval_set["negatives"]]
+
+    fired = [(query, expected, app.route_intent(query)) for query, expected in labelled]
+    fired = [(query, expected, routed["intent"]) for query, expected, routed in fired if routed]
+    wrong = [(query, expected, actual) for query, expected, actual in fired if actual != expected]
+    recall = sum(1 for _, expected, actual in fired if actual == expected) / len(eval_set["positives"])
+
+    assert not wrong, f"Misrouted at threshold {app.Config.INTENT_CONFIDENCE_THRESHOLD}: {wrong}"
+    assert recall >= 0.5, f"Recall {recall:.2f} at threshold {app.Config.INTENT_CONFIDENCE_THRESHOLD}"